@@ -1,25 +1,150 @@
 import os
-from typing import Optional, Dict, Any, List, Union, Literal
-from fastapi import FastAPI, HTTPException, Header, Depends
-from pydantic import BaseModel, HttpUrl, Field, conint
+import json
+import logging
+import re
+import hmac
+import uuid
+import base64
+import asyncio
+import httpx
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Union, Literal, NamedTuple, Tuple, Callable, Coroutine, Iterator
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.utils import get_openapi
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ConfigDict, HttpUrl, Field, conint, TypeAdapter, ValidationError
 from dotenv import load_dotenv
-from crawl4ai import AsyncWebCrawler, CrawlResult
+from crawl4ai import AsyncWebCrawler, CrawlResult, CacheMode
 from crawl4ai.async_configs import BrowserConfig, CrawlerRunConfig
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+from crawl4ai.async_dispatcher import SemaphoreDispatcher
+from crawl4ai.models import CrawlResultContainer
+from crawl4ai.antibot_detector import is_blocked
+from crawl4ai.utils import fast_format_html
+from selectolax.lexbor import LexborHTMLParser, SelectolaxError
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Get API token from environment
 API_TOKEN = os.getenv("API_TOKEN")
 if not API_TOKEN:
     raise ValueError("API_TOKEN environment variable is not set")
+API_TOKEN_BYTES = API_TOKEN.encode()
+
+# Number of pages a pooled browser serves before it is relaunched
+CRAWLER_MAX_USES = int(os.getenv("CRAWLER_MAX_USES", "200"))
+# Maximum number of pooled browsers, one per distinct set of browser settings
+CRAWLER_POOL_SIZE = int(os.getenv("CRAWLER_POOL_SIZE", "4"))
+# Open the default browser context when a pooled browser is launched, set to 0 to disable
+CRAWLER_WARMUP = os.getenv("CRAWLER_WARMUP", "1") == "1"
+WARMUP_URL = "raw:<html><body></body></html>"
+
+# Micro-batching of concurrent /crawl requests into arun_many calls
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "20"))
+
+# In-memory cache of successful crawls, in front of crawl4ai's disk cache
+RESPONSE_CACHE = TTLCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+)
+# Options that turn off cache reads or depend on browser session state
+CACHE_BYPASS_OPTIONS = ("bypass_cache", "disable_cache", "no_cache_read", "session_id", "js_only")
+# Cache shorthands crawl4ai rejects, and the cache_mode each one stands for
+CACHE_SHORTHANDS = {
+    "bypass_cache": CacheMode.BYPASS,
+    "disable_cache": CacheMode.DISABLED,
+    "no_cache_read": CacheMode.WRITE_ONLY,
+    "no_cache_write": CacheMode.READ_ONLY
+}
+
+# Settings and options that need a rendered browser page, ruling out the HTTP fast path
+BROWSER_ONLY_SETTINGS = ("proxy", "proxy_config", "cookies", "use_persistent_context", "user_data_dir", "use_managed_browser")
+BROWSER_ONLY_OPTIONS = (
+    "js_code", "js_only", "wait_for", "wait_for_images", "session_id", "scan_full_page",
+    "process_iframes", "remove_overlay_elements", "simulate_user", "override_navigator",
+    "magic", "adjust_viewport_to_content", "screenshot", "pdf"
+)
+
+# Server worker processes, each with its own browsers, caches and screenshot store.
+# A single one by default so /crawl/screenshot/{id} reaches the process holding the screenshot
+WORKERS = int(os.getenv("WORKERS", "1"))
+
+# Worker processes for CPU-bound HTML post-processing, sharing the CPUs between server workers
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 1) // WORKERS))))
+
+# Screenshots kept for retrieval through /crawl/screenshot/{id}
+SCREENSHOT_STORE = TTLCache(
+    maxsize=int(os.getenv("SCREENSHOT_STORE_SIZE", "256")),
+    ttl=float(os.getenv("SCREENSHOT_TTL", "300"))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Keep warm crawlers for the lifetime of the process so each request only pays
+    for a new page instead of a full browser launch.
+    """
+    app.state.cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        verify=False,  # Static crawls only run with ignore_https_errors
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=100)
+    )
+    app.state.crawlers = {}
+    app.state.crawlers_lock = asyncio.Lock()
+    await get_crawler(BROWSER_DEFAULTS)
+    app.state.crawl_queue = asyncio.Queue()
+    app.state.batch_tasks = set()
+    batch_worker = asyncio.create_task(crawl_batch_worker(app.state.crawl_queue))
+    try:
+        yield
+    finally:
+        batch_worker.cancel()
+        for task in app.state.batch_tasks:
+            task.cancel()
+        await asyncio.gather(batch_worker, *app.state.batch_tasks, return_exceptions=True)
+        for crawler in app.state.crawlers.values():
+            await crawler.close()
+        app.state.crawlers.clear()
+        await app.state.http.aclose()
+        app.state.cpu_pool.shutdown(cancel_futures=True)
+
+def orjson_default(value: Any) -> Any:
+    """Serialize the values of a crawl result that orjson does not handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return str(value)
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response encoded by orjson in a single pass, so multi-megabyte crawl
+    results are not re-validated through Pydantic nor encoded by the stdlib json module.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
 
 app = FastAPI(
     title="Fast Crawler API",
     description="API for extracting web content using Crawl4AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 class BrowserSettings(BaseModel):
     """
@@ -118,8 +243,11 @@ class BrowserSettings(BaseModel):
         example=["--disable-extensions", "--disable-gpu"]
     )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "viewport_width": 1920,
                 "viewport_height": 1080,
@@ -133,6 +261,7 @@ class BrowserSettings(BaseModel):
                 }
             }
         }
+    )
 
 class ExtractionField(BaseModel):
     """
@@ -151,8 +280,11 @@ class ExtractionField(BaseModel):
     default: Optional[Any] = Field(None, description="Default value if nothing is found")
     fields: Optional[List['ExtractionField']] = Field(None, description="Sub-fields for nested/list/nested_list types")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "name": "price",
                 "selector": "span.price",
@@ -160,6 +292,7 @@ class ExtractionField(BaseModel):
                 "default": "0"
             }
         }
+    )
 
 class ExtractionSchema(BaseModel):
     """
@@ -170,8 +303,11 @@ class ExtractionSchema(BaseModel):
     baseFields: Optional[List[ExtractionField]] = Field(None, description="Fields to extract from the container element")
     fields: List[ExtractionField] = Field(..., description="List of fields to extract")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "name": "Product List",
                 "baseSelector": "div.product-card",
@@ -224,9 +360,10 @@ class ExtractionSchema(BaseModel):
                 ]
             }
         }
+    )
 
 # Référence circulaire pour les sous-champs
-ExtractionField.update_forward_refs()
+ExtractionField.model_rebuild()
 
 class CrawlerConfig(BaseModel):
     """
@@ -283,6 +420,12 @@ class CrawlerConfig(BaseModel):
         default=False,
         description="Remove all <form> elements from the output. Helpful for cleaning up interactive elements."
     )
+    response_fields: Optional[List[str]] = Field(
+        default=None,
+        description="""Result fields to return, all fields by default. Unknown fields are returned as null.
+        Example: ["extracted_content", "status_code"]""",
+        example=["extracted_content", "status_code"]
+    )
 
     # Page Navigation & Timing
     wait_until: Optional[str] = Field(
@@ -345,6 +488,12 @@ class CrawlerConfig(BaseModel):
             "window.scrollTo(0, document.body.scrollHeight)"
         ]
     )
+    join_js_code: Optional[bool] = Field(
+        default=False,
+        description="""Run a js_code list as a single script, in one browser round-trip instead of one per command.
+        Only for simple statements: a syntax error in any command stops the whole script, and commands
+        after a navigation run on the old page instead of the new one."""
+    )
     js_only: Optional[bool] = Field(
         default=False,
         description="""Only execute JavaScript without reloading the page.
@@ -394,6 +543,11 @@ class CrawlerConfig(BaseModel):
         default=False,
         description="Capture a screenshot of the page (returned as base64 string)."
     )
+    screenshot_reference: Optional[bool] = Field(
+        default=False,
+        description="""Return a screenshot_id instead of the base64 screenshot.
+        The raw image is then available from /crawl/screenshot/{screenshot_id} for a limited time."""
+    )
     screenshot_wait_for: Optional[float] = Field(
         default=None,
         description="Additional wait time (in seconds) before taking screenshot",
@@ -489,8 +643,11 @@ class CrawlerConfig(BaseModel):
         description="Log browser console output for debugging JavaScript issues."
     )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "css_selector": "article.main-content",
                 "excluded_tags": ["script", "style", "nav", "footer"],
@@ -504,65 +661,589 @@ class CrawlerConfig(BaseModel):
                 "verbose": True
             }
         }
+    )
+
+# Default settings shared by every request omitting them; read-only as the models are frozen
+DEFAULT_BROWSER = BrowserSettings()
+DEFAULT_CRAWLER = CrawlerConfig()
+
+# Serialized defaults, merged with the fields each request actually provides
+BROWSER_DEFAULTS = DEFAULT_BROWSER.model_dump(exclude_none=True)
+CRAWLER_DEFAULTS = DEFAULT_CRAWLER.model_dump(exclude_none=True)
 
 class URLInput(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True, populate_by_name=True)
+
     url: HttpUrl
-    browser: Optional[BrowserSettings] = Field(default_factory=BrowserSettings, description="Browser configuration options")
-    config: Optional[CrawlerConfig] = Field(default_factory=CrawlerConfig, description="Crawler configuration options")
+    browser: Optional[BrowserSettings] = Field(default_factory=lambda: DEFAULT_BROWSER, description="Browser configuration options")
+    config: Optional[CrawlerConfig] = Field(default_factory=lambda: DEFAULT_CRAWLER, description="Crawler configuration options")
+
+# Cheap URL check for trusted callers of /crawl_fast
+URL_PATTERN = r"^https?://[^\s]+$"
+
+class URLInputFast(URLInput):
+    url: str = Field(..., pattern=URL_PATTERN, description="HTTP/HTTPS URL, only checked against a simple pattern")
+
+# Request bodies are parsed and validated straight from JSON bytes by pydantic-core
+URL_INPUT_ADAPTER = TypeAdapter(URLInput)
+URL_INPUT_FAST_ADAPTER = TypeAdapter(URLInputFast)
 
 class CrawlResponse(BaseModel):
     url: HttpUrl
     result: Dict[str, Any]
 
+def json_body(adapter: TypeAdapter) -> Callable[[Request], Coroutine[Any, Any, Any]]:
+    """Dependency parsing and validating the raw request body with the given adapter."""
+    async def parse_body(request: Request) -> Any:
+        try:
+            return adapter.validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError([
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ])
+    return parse_body
+
+def json_body_schema(model: type) -> Dict[str, Any]:
+    """OpenAPI request body of an endpoint parsing the model through json_body()."""
+    return {"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{model.__name__}"}}}
+    }}
+
 async def verify_token(x_token: str = Header(...)):
-    if x_token != API_TOKEN:
+    if not hmac.compare_digest(x_token.encode(), API_TOKEN_BYTES):
         raise HTTPException(
             status_code=401,
             detail="Invalid API token"
         )
     return x_token
 
-@app.post("/crawl", response_model=CrawlResponse)
-async def crawl_url(url_input: URLInput, token: str = Depends(verify_token)):
+def settings_dict(settings: BaseModel, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same result as settings.model_dump(exclude_none=True), but only the fields the
+    client sent are serialized; everything else comes from the precomputed defaults.
+    """
+    if not settings.model_fields_set:
+        return dict(defaults)
+    merged = {**defaults, **settings.model_dump(exclude_unset=True, exclude_none=True)}
+    for name in settings.model_fields_set:
+        if getattr(settings, name) is None:
+            merged.pop(name, None)
+    return merged
+
+def build_browser_config(browser_dict: Dict[str, Any]) -> BrowserConfig:
+    return BrowserConfig(
+        headless=True,  # Fixed value
+        browser_type="chromium",  # Fixed value
+        verbose=True,
+        **browser_dict
+    )
+
+class PooledCrawler:
+    """
+    Long-lived crawler that relaunches its browser every max_uses pages, keeping the
+    memory leaked by long-running browser contexts bounded while still amortizing
+    the launch cost. Pages still running on a retired browser finish before it is closed.
+    BrowserConfig.max_pages_before_recycle is not used: it only replaces the browser
+    contexts, the Chromium process whose memory grows keeps running.
+    """
+
+    def __init__(self, browser_config: BrowserConfig, max_uses: int = CRAWLER_MAX_USES):
+        self.browser_config = browser_config
+        self.max_uses = max_uses
+        self.uses = 0
+        self.crawler: Optional[AsyncWebCrawler] = None
+        # Unpooled crawlers only launch a browser for the pages they are running
+        self.pooled = True
+        self._in_flight: Dict[AsyncWebCrawler, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Launch a browser and make it the current one. A failed launch is closed again."""
+        crawler = AsyncWebCrawler(config=self.browser_config)
+        try:
+            await crawler.__aenter__()
+            if CRAWLER_WARMUP:
+                await self._warm_up(crawler)
+        except BaseException:
+            with suppress(Exception):
+                await crawler.__aexit__(None, None, None)
+            raise
+        self._in_flight[crawler] = 0
+        self.crawler = crawler
+        self.uses = 0
+
+    async def _warm_up(self, crawler: AsyncWebCrawler) -> None:
+        # crawl4ai keeps one browser context per context-affecting run settings
+        # (proxy, locale, magic...) and opens pages in it, so once the context of
+        # the default settings exists requests using them only pay for a new page.
+        # Best effort: the browser is usable without it
+        try:
+            await crawler.arun(url=WARMUP_URL, config=CrawlerRunConfig(process_in_browser=True))
+        except Exception:
+            logger.warning("Warming up the browser context failed", exc_info=True)
+
+    async def close(self) -> None:
+        # Detached first so a request acquiring meanwhile launches a new browser
+        crawlers = list(self._in_flight)
+        self._in_flight.clear()
+        self.crawler = None
+        for crawler in crawlers:
+            await crawler.__aexit__(None, None, None)
+
+    def idle(self) -> bool:
+        return not self._lock.locked() and not any(self._in_flight.values())
+
+    async def _acquire(self, pages: int) -> AsyncWebCrawler:
+        async with self._lock:
+            if self.crawler is None:
+                await self.start()
+            elif self.uses >= self.max_uses:
+                retired = self.crawler
+                try:
+                    await self.start()
+                except Exception:
+                    # Keep serving from the current browser, the relaunch is retried on the next pages
+                    logger.warning("Relaunching the browser failed", exc_info=True)
+                else:
+                    await self._close_if_retired(retired)
+            self.uses += pages
+            self._in_flight[self.crawler] += 1
+            return self.crawler
+
+    async def _release(self, crawler: AsyncWebCrawler) -> None:
+        self._in_flight[crawler] -= 1
+        await self._close_if_retired(crawler)
+        if not self.pooled and self.idle():
+            await self.close()
+
+    async def _close_if_retired(self, crawler: AsyncWebCrawler) -> None:
+        if crawler is not self.crawler and not self._in_flight[crawler]:
+            del self._in_flight[crawler]
+            await crawler.__aexit__(None, None, None)
+
+    async def arun_many(self, urls: List[str], config: CrawlerRunConfig) -> List[CrawlResult]:
+        crawler = await self._acquire(len(urls))
+        try:
+            # The urls come from independent client requests, not one crawl job, so they all
+            # run at once with no per-domain delay. SemaphoreDispatcher keeps the urls order
+            dispatcher = SemaphoreDispatcher(semaphore_count=len(urls), rate_limiter=None)
+            results = await crawler.arun_many(urls=urls, config=config, dispatcher=dispatcher)
+        finally:
+            await self._release(crawler)
+        # arun_many returns the container arun wraps each single result in
+        return [result[0] if isinstance(result, CrawlResultContainer) else result for result in results]
+
+class CrawlJob(NamedTuple):
+    url: str
+    browser_dict: Dict[str, Any]
+    run_config: CrawlerRunConfig
+    key: Tuple[str, str]
+    future: asyncio.Future
+
+class FastJsonCssExtractionStrategy(JsonCssExtractionStrategy):
+    """
+    JsonCssExtractionStrategy running its selectors on selectolax (lexbor) instead of
+    BeautifulSoup, for the selectors lexbor_supports() accepts. Values can still differ:
+    lexbor builds an HTML5 tree where BeautifulSoup keeps the markup as written (a <tbody>
+    is added to tables, so "tbody td" matches <table><tr><td> on lexbor only), and the
+    markup of "html" fields may be serialized slightly differently.
+    """
+
+    # Attributes BeautifulSoup returns as a list of values
+    MULTI_VALUED_ATTRIBUTES = {"class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"}
+    # Elements whose text BeautifulSoup leaves out of get_text()
+    NON_TEXT_TAGS = {"script", "style"}
+
+    def _parse_html(self, html_content: str):
+        return LexborHTMLParser(html_content)
+
+    def _get_base_elements(self, parsed_html, selector: str):
+        return parsed_html.css(selector)
+
+    def _get_elements(self, element, selector: str):
+        # selectolax also matches the element itself, BeautifulSoup only its descendants
+        return [node for node in element.css(selector) if node.mem_id != element.mem_id]
+
+    def _get_element_text(self, element) -> str:
+        if element.css_first("script, style") is None:
+            return element.text(strip=True)
+        return "".join(
+            node.text_content.strip()
+            for node in element.traverse(include_text=True)
+            if node.tag == "-text"
+            and (node.parent.tag not in self.NON_TEXT_TAGS or node.parent.mem_id == element.mem_id)
+        )
+
+    def _get_element_html(self, element) -> str:
+        return element.html
+
+    def _get_element_attribute(self, element, attribute: str):
+        attributes = element.attributes
+        if attribute not in attributes:
+            return None
+        value = attributes[attribute] or ""
+        return value.split() if attribute in self.MULTI_VALUED_ATTRIBUTES else value
+
+    def _resolve_source(self, element, source: str):
+        source = source.strip()
+        if not source.startswith("+"):
+            return None
+        tag, *classes = [part.strip() for part in source[1:].strip().split(".")]
+        classes = [name for name in classes if name]
+        sibling = element.next
+        while sibling is not None:
+            if not sibling.tag.startswith("-") and (not tag or sibling.tag == tag):
+                sibling_classes = (sibling.attributes.get("class") or "").split()
+                if all(name in sibling_classes for name in classes):
+                    return sibling
+            sibling = sibling.next
+        return None
+
+# Pseudo-classes lexbor parses but matches differently than BeautifulSoup's soupsieve
+LEXBOR_DIVERGENT_SELECTOR = re.compile(r":(enabled|disabled|read-only|read-write|empty)\b")
+LEXBOR_PROBE = LexborHTMLParser("")
+
+def schema_selectors(fields: List[Dict[str, Any]]) -> Iterator[str]:
+    for field in fields:
+        if field.get("selector"):
+            yield field["selector"]
+        yield from schema_selectors(field.get("fields") or [])
+
+def lexbor_supports(schema: Dict[str, Any]) -> bool:
+    """
+    Whether every selector of the schema matches the same elements on lexbor as with
+    BeautifulSoup. soupsieve extensions such as :scope or :-soup-contains fail to parse.
+    """
+    selectors = [
+        schema["baseSelector"],
+        *schema_selectors(schema.get("baseFields") or []),
+        *schema_selectors(schema["fields"])
+    ]
+    for selector in selectors:
+        if LEXBOR_DIVERGENT_SELECTOR.search(selector):
+            return False
+        try:
+            LEXBOR_PROBE.css(selector)
+        except SelectolaxError:
+            return False
+    return True
+
+@lru_cache(maxsize=512)
+def get_extraction_strategy(schema_json: str) -> JsonCssExtractionStrategy:
+    """
+    Build the extraction strategy once per distinct schema, keyed by its canonical JSON,
+    so repeated template scrapes reuse the same instance. Schemas using selectors
+    lexbor does not support keep crawl4ai's BeautifulSoup strategy.
+    """
+    schema = json.loads(schema_json)
+    strategy_class = FastJsonCssExtractionStrategy if lexbor_supports(schema) else JsonCssExtractionStrategy
+    return strategy_class(schema=schema, verbose=True)
+
+# A top-level return would end a merged script before the following commands
+RETURN_STATEMENT = re.compile(r"\breturn\b")
+
+def join_js_code(scripts: List[str]) -> Union[str, List[str]]:
+    """
+    Merge js_code commands into one script so crawl4ai evaluates them in a single call.
+    Each command keeps its own try block, so a runtime error does not skip the next ones.
+    A syntax error still fails the whole merged script, none of the commands run then.
+    """
+    if any(RETURN_STATEMENT.search(script) for script in scripts):
+        return scripts
+    return "\n".join(
+        f"try {{\n{script}\n}} catch (err) {{ console.error(err); }}"
+        for script in scripts
+    )
+
+def settings_key(settings: Dict[str, Any]) -> str:
+    """Canonical JSON form of a settings dict, usable as a key even with nested lists and dicts."""
+    return json.dumps(settings, sort_keys=True)
+
+async def get_crawler(browser_dict: Dict[str, Any]) -> PooledCrawler:
+    """
+    Return the pooled crawler for these browser settings, launching it on first use.
+    Once CRAWLER_POOL_SIZE browsers are pooled, the least recently used idle one is
+    closed to make room. When they are all busy, the returned crawler is unpooled.
+    """
+    key = settings_key(browser_dict)
+    crawlers = app.state.crawlers
+    crawler = crawlers.pop(key, None)
+    if crawler is not None:
+        # Kept ordered from least to most recently used
+        crawlers[key] = crawler
+        return crawler
+    async with app.state.crawlers_lock:
+        crawler = crawlers.get(key)
+        if crawler is not None:
+            return crawler
+        crawler = PooledCrawler(build_browser_config(browser_dict))
+        if len(crawlers) >= CRAWLER_POOL_SIZE:
+            evicted_key = next((candidate for candidate, pooled in crawlers.items() if pooled.idle()), None)
+            if evicted_key is None:
+                crawler.pooled = False
+                return crawler
+            evicted = crawlers.pop(evicted_key)
+            evicted.pooled = False
+            await evicted.close()
+        await crawler.start()
+        crawlers[key] = crawler
+    return crawler
+
+async def crawl_batch_worker(queue: asyncio.Queue) -> None:
+    """
+    Collect the jobs queued within BATCH_MAX_WAIT_MS and dispatch the ones sharing
+    identical browser and crawler settings through a single arun_many call.
+    """
+    while True:
+        batch = [await queue.get()]
+        await asyncio.sleep(BATCH_MAX_WAIT_MS / 1000)
+        while len(batch) < BATCH_MAX_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        groups: Dict[Tuple[str, str], List[CrawlJob]] = {}
+        for job in batch:
+            groups.setdefault(job.key, []).append(job)
+        for jobs in groups.values():
+            task = asyncio.create_task(run_crawl_jobs(jobs))
+            app.state.batch_tasks.add(task)
+            task.add_done_callback(app.state.batch_tasks.discard)
+
+async def run_crawl_jobs(jobs: List[CrawlJob]) -> None:
+    try:
+        crawler = await get_crawler(jobs[0].browser_dict)
+        results = await crawler.arun_many([job.url for job in jobs], jobs[0].run_config)
+    except Exception as e:
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(e)
+        return
+    for job, result in zip(jobs, results):
+        if not job.future.done():
+            job.future.set_result(result)
+
+def is_cacheable(config_dict: Dict[str, Any]) -> bool:
+    return config_dict.get("cache_mode") == "enabled" and not any(
+        config_dict.get(option) for option in CACHE_BYPASS_OPTIONS
+    )
+
+def is_static_crawl(browser_dict: Dict[str, Any], config_dict: Dict[str, Any]) -> bool:
+    """Whether the page can be fetched over plain HTTP instead of being rendered in a browser."""
+    return (
+        browser_dict.get("java_script_enabled") is False
+        and bool(browser_dict.get("ignore_https_errors", True))
+        and not any(browser_dict.get(setting) for setting in BROWSER_ONLY_SETTINGS)
+        and not any(config_dict.get(option) for option in BROWSER_ONLY_OPTIONS)
+    )
+
+# User agent of crawl4ai's browser, sent by static crawls when the request sets none
+STATIC_USER_AGENT = BrowserConfig().user_agent
+
+async def crawl_static(url: str, browser_dict: Dict[str, Any], run_config: CrawlerRunConfig) -> CrawlResult:
+    """
+    Fetch the page over HTTP and let crawl4ai process it as raw HTML, which it does
+    without opening a browser page.
+    """
+    headers = httpx.Headers(browser_dict.get("headers") or {})
+    headers["User-Agent"] = browser_dict.get("user_agent") or headers.get("User-Agent", STATIC_USER_AGENT)
     try:
-        # Convert browser settings to BrowserConfig
-        browser_dict = url_input.browser.model_dump(exclude_none=True)
-        browser_config = BrowserConfig(
-            headless=True,  # Fixed value
-            browser_type="chromium",  # Fixed value
-            verbose=True,
-            **browser_dict
+        response = await app.state.http.get(
+            url,
+            headers=headers,
+            timeout=run_config.page_timeout / 1000 or None
+        )
+    except httpx.HTTPError as e:
+        # Reported as a failed crawl, like crawl4ai does when the browser cannot load the page
+        return CrawlResult(url=url, html="", success=False, error_message=str(e))
+
+    # Resolve links against the fetched URL
+    run_config.base_url = str(response.url)
+    crawler = await get_crawler(BROWSER_DEFAULTS)
+    [result] = await crawler.arun_many(["raw:" + response.text], run_config)
+    result.url = url
+    result.redirected_url = str(response.url)
+    result.status_code = response.status_code
+    result.response_headers = dict(response.headers)
+    # crawl4ai skips its anti-bot check for raw: HTML, run it as the browser path does
+    blocked, reason = is_blocked(response.status_code, response.text)
+    if blocked:
+        result.success = False
+        result.error_message = f"Blocked by anti-bot protection: {reason}"
+    return result
+
+async def run_crawl(
+    url: str,
+    browser_dict: Dict[str, Any],
+    config_dict: Dict[str, Any],
+    job_key: Tuple[str, str]
+) -> CrawlResult:
+    """Crawl static pages over HTTP, otherwise queue the crawl for the batch worker."""
+    # Handle extraction strategy if provided
+    if "extraction_schema" in config_dict:
+        schema = config_dict.pop("extraction_schema")
+        config_dict["extraction_strategy"] = get_extraction_strategy(
+            json.dumps(schema, sort_keys=True)
         )
+
+    for option, cache_mode in CACHE_SHORTHANDS.items():
+        if config_dict.pop(option, False):
+            config_dict["cache_mode"] = cache_mode
+    if "cache_mode" in config_dict:
+        config_dict["cache_mode"] = CacheMode(config_dict["cache_mode"])
+
+    run_config = CrawlerRunConfig(**config_dict)
+    if is_static_crawl(browser_dict, config_dict):
+        return await crawl_static(url, browser_dict, run_config)
+
+    future = asyncio.get_running_loop().create_future()
+    await app.state.crawl_queue.put(CrawlJob(
+        url=url,
+        browser_dict=browser_dict,
+        run_config=run_config,
+        key=job_key,
+        future=future
+    ))
+    return await future
+
+@app.post(
+    "/crawl",
+    response_class=OrjsonResponse,
+    responses={200: {"model": CrawlResponse}},
+    openapi_extra=json_body_schema(URLInput)
+)
+async def crawl_url(
+    token: str = Depends(verify_token),  # Checked before the body is parsed
+    url_input: URLInput = Depends(json_body(URL_INPUT_ADAPTER))
+):
+    return await crawl(url_input)
+
+@app.post(
+    "/crawl_fast",
+    response_class=OrjsonResponse,
+    responses={200: {"model": CrawlResponse}},
+    openapi_extra=json_body_schema(URLInputFast)
+)
+async def crawl_url_fast(
+    token: str = Depends(verify_token),  # Checked before the body is parsed
+    url_input: URLInputFast = Depends(json_body(URL_INPUT_FAST_ADAPTER))
+):
+    """
+    Same as /crawl for trusted callers: the URL is only checked against a simple
+    pattern instead of being fully parsed and normalized.
+    """
+    return await crawl(url_input)
+
+async def crawl(url_input: URLInput) -> OrjsonResponse:
+    try:
+        browser_dict = settings_dict(url_input.browser, BROWSER_DEFAULTS)
         
         # Convert crawler config to CrawlerRunConfig
-        config_dict = url_input.config.model_dump(exclude_none=True)
-
-        # Handle extraction strategy if provided
-        if "extraction_schema" in config_dict:
-            schema = config_dict.pop("extraction_schema")
-            config_dict["extraction_strategy"] = JsonCssExtractionStrategy(
-                schema=schema,
-                verbose=True
-            )
+        config_dict = settings_dict(url_input.config, CRAWLER_DEFAULTS)
+        screenshot_reference = config_dict.pop("screenshot_reference", False)
+        # Prettified off the event loop once the crawl is done, see below
+        prettify = config_dict.pop("prettiify", False)
+        # Applied on the crawl result, cached results keep every field
+        response_fields = config_dict.pop("response_fields", None)
+        if config_dict.pop("join_js_code", False) and isinstance(config_dict.get("js_code"), list):
+            config_dict["js_code"] = join_js_code(config_dict["js_code"])
+        url = str(url_input.url)
+        job_key = (settings_key(browser_dict), settings_key(config_dict))
 
-        run_config = CrawlerRunConfig(**config_dict)
+        # Serve repeated crawls from memory while they are fresh
+        use_cache = is_cacheable(config_dict)
+        # Results of no_cache_write requests are never stored
+        store_result = use_cache and not config_dict.get("no_cache_write")
+        cache_key = (url, *job_key)
+        result = RESPONSE_CACHE.get(cache_key) if use_cache else None
+        if result is None:
+            result = await run_crawl(url, browser_dict, config_dict, job_key)
+            # Error pages are crawled again rather than served from memory
+            if store_result and result.success and (result.status_code or 200) < 400:
+                RESPONSE_CACHE[cache_key] = result
 
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            result = await crawler.arun(
-                url=str(url_input.url),
-                config=run_config
-            )
-            
-            return CrawlResponse(
-                url=url_input.url,
-                result=result.__dict__
+        # model_dump rather than __dict__, which lacks the markdown kept in a private attribute.
+        # Fields left out of response_fields are not serialized at all. fit_html only holds
+        # crawl4ai's deprecation placeholder, the value is markdown.fit_html
+        result_dict = result.model_dump(
+            include=set(response_fields) if response_fields else None,
+            exclude={"fit_html"}
+        )
+        if prettify and result.cleaned_html and "cleaned_html" in result_dict:
+            cleaned_html = await asyncio.get_running_loop().run_in_executor(
+                app.state.cpu_pool, fast_format_html, result.cleaned_html
             )
+            result_dict["cleaned_html"] = cleaned_html
+        if screenshot_reference and result.screenshot:
+            screenshot_id = uuid.uuid4().hex
+            SCREENSHOT_STORE[screenshot_id] = result.screenshot
+            result_dict["screenshot"] = None
+            result_dict["screenshot_id"] = screenshot_id
+        if response_fields:
+            result_dict = {field: result_dict.get(field) for field in response_fields}
+        
+        return OrjsonResponse({
+            "url": url,
+            "result": result_dict
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error crawling URL: {str(e)}"
         )
 
+@app.get(
+    "/crawl/screenshot/{screenshot_id}",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}, "image/jpeg": {}}}}
+)
+async def get_screenshot(screenshot_id: str, token: str = Depends(verify_token)):
+    screenshot = SCREENSHOT_STORE.get(screenshot_id)
+    if screenshot is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Screenshot not found or expired"
+        )
+    image = base64.b64decode(screenshot)
+    return Response(
+        content=image,
+        media_type="image/jpeg" if image.startswith(b"\xff\xd8") else "image/png"
+    )
+
+def openapi_schema() -> Dict[str, Any]:
+    """
+    Build the OpenAPI schema, registering the request models that are parsed
+    manually in their endpoint and are therefore unknown to FastAPI.
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        description=app.description,
+        routes=app.routes
+    )
+    components = schema.setdefault("components", {}).setdefault("schemas", {})
+    for model in (URLInput, URLInputFast):
+        model_schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+        components.update(model_schema.pop("$defs", {}))
+        components[model.__name__] = model_schema
+    app.openapi_schema = schema
+    return schema
+
+app.openapi = openapi_schema
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Single auto-reloading process in development, WORKERS processes otherwise.
+    # Every worker process runs its own browser pool.
+    is_dev = bool(os.getenv("DEV"))
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if is_dev else WORKERS,
+        reload=is_dev
+    )
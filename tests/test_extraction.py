@@ -0,0 +1,125 @@
+import os
+import json
+
+os.environ.setdefault("API_TOKEN", "test")
+
+import pytest
+from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
+from main import FastJsonCssExtractionStrategy, get_extraction_strategy
+
+PRODUCTS_HTML = """
+<html><body>
+  <div class="product-card featured" data-product-id="1">
+    <h2 class="product-title">  Red <b>shoes</b> </h2>
+    <span class="price">42 &euro;</span>
+    <script>var tracking = 1;</script>
+    <a class="link" href="/p/1" rel="nofollow noopener">details</a>
+    <ul class="tags"><li>new</li><li>sale</li></ul>
+    <div class="seller"><span class="name">Shop A</span><span class="rating">4.5</span></div>
+  </div>
+  <tr class="meta"><td>after 1</td></tr>
+  <div class="product-card" data-product-id="2">
+    <h2 class="product-title">Blue hat<style>.x { color: red }</style></h2>
+    <a class="link" href="/p/2">details</a>
+    <ul class="tags"></ul>
+  </div>
+  <form class="product-card" data-product-id="3">
+    <fieldset disabled><input name="qty" value="1"></fieldset>
+    <input name="size" value="M">
+  </form>
+</body></html>
+"""
+
+PRODUCTS_SCHEMA = {
+    "name": "Products",
+    "baseSelector": ".product-card",
+    "baseFields": [
+        {"name": "id", "type": "attribute", "attribute": "data-product-id"},
+        {"name": "classes", "type": "attribute", "attribute": "class"},
+    ],
+    "fields": [
+        {"name": "title", "selector": "h2.product-title", "type": "text"},
+        {"name": "price", "selector": ".price", "type": "text", "default": "0"},
+        {"name": "rel", "selector": "a.link", "type": "attribute", "attribute": "rel"},
+        {"name": "href", "selector": "a.link", "type": "attribute", "attribute": "href"},
+        {"name": "tags", "selector": "ul.tags li", "type": "list", "fields": [{"name": "tag", "type": "text"}]},
+        {
+            "name": "seller",
+            "selector": ".seller",
+            "type": "nested",
+            "fields": [
+                {"name": "name", "selector": ".name", "type": "text"},
+                {"name": "rating", "selector": ".rating", "type": "text"},
+            ],
+        },
+        {
+            "name": "links",
+            "selector": "a",
+            "type": "nested_list",
+            "fields": [{"name": "text", "type": "text"}, {"name": "href", "type": "attribute", "attribute": "href"}],
+        },
+    ],
+}
+
+ARTICLE_HTML = """
+<html><body>
+  <article><h2>First</h2><section><h2>Nested</h2><p>Price: 10</p></section><p>Other</p></article>
+  <article><h2>Second</h2><p>Price: 20</p><p> </p></article>
+</body></html>
+"""
+
+
+def with_fields(*fields):
+    return {"name": "Articles", "baseSelector": "article", "fields": list(fields)}
+
+
+def cached_strategy(schema):
+    return get_extraction_strategy(json.dumps(schema, sort_keys=True))
+
+
+def extract(strategy_class, schema, html):
+    return strategy_class(schema=schema).extract("https://example.com", html)
+
+
+def test_extraction_matches_beautifulsoup():
+    assert extract(FastJsonCssExtractionStrategy, PRODUCTS_SCHEMA, PRODUCTS_HTML) == extract(
+        JsonCssExtractionStrategy, PRODUCTS_SCHEMA, PRODUCTS_HTML
+    )
+
+
+def test_text_leaves_out_scripts_and_styles():
+    schema = {"name": "Text", "baseSelector": ".product-card", "fields": [{"name": "text", "type": "text", "selector": "h2"}]}
+    items = extract(FastJsonCssExtractionStrategy, schema, PRODUCTS_HTML)
+    assert items[1]["text"] == "Blue hat"
+    assert items == extract(JsonCssExtractionStrategy, schema, PRODUCTS_HTML)
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        with_fields({"name": "title", "selector": ":scope > h2", "type": "text"}),
+        with_fields({"name": "price", "selector": 'p:-soup-contains("Price")', "type": "text"}),
+        with_fields({"name": "price", "selector": "p:contains(Price)", "type": "text"}),
+        with_fields({"name": "blank", "selector": "p:empty", "type": "list", "fields": [{"name": "text", "type": "text"}]}),
+        {
+            "name": "Inputs",
+            "baseSelector": "form",
+            "fields": [{"name": "enabled", "selector": "input:enabled", "type": "list", "fields": [
+                {"name": "name", "type": "attribute", "attribute": "name"}
+            ]}],
+        },
+    ],
+)
+def test_unsupported_selectors_use_beautifulsoup(schema):
+    html = PRODUCTS_HTML if schema["name"] == "Inputs" else ARTICLE_HTML
+    strategy = cached_strategy(schema)
+    assert type(strategy) is JsonCssExtractionStrategy
+    assert strategy.extract("https://example.com", html) == extract(JsonCssExtractionStrategy, schema, html)
+
+
+def test_supported_selectors_use_lexbor():
+    schema = with_fields({"name": "title", "selector": "h2:first-child", "type": "text"})
+    strategy = cached_strategy(schema)
+    assert type(strategy) is FastJsonCssExtractionStrategy
+    assert strategy.extract("https://example.com", ARTICLE_HTML) == extract(JsonCssExtractionStrategy, schema, ARTICLE_HTML)
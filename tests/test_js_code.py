@@ -0,0 +1,27 @@
+import os
+
+os.environ.setdefault("API_TOKEN", "test")
+
+from main import CrawlerConfig, join_js_code
+
+
+def test_join_js_code_merges_commands_in_order():
+    merged = join_js_code([
+        "document.querySelector('.cookie-accept')?.click()",
+        "window.scrollTo(0, document.body.scrollHeight)",
+    ])
+
+    assert merged == (
+        "try {\ndocument.querySelector('.cookie-accept')?.click()\n} catch (err) { console.error(err); }\n"
+        "try {\nwindow.scrollTo(0, document.body.scrollHeight)\n} catch (err) { console.error(err); }"
+    )
+
+
+def test_join_js_code_keeps_lists_with_return():
+    scripts = ["window.scrollTo(0, 500)", "return document.title"]
+
+    assert join_js_code(scripts) is scripts
+
+
+def test_join_js_code_is_opt_in():
+    assert CrawlerConfig().join_js_code is False